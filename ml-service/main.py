@@ -2,16 +2,29 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import List, Literal
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import time
+import numpy as np
+import pandas as pd
 
 # Import route modules
 from routes.forecast import router as forecast_router
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging: handlers only enqueue records, a listener thread does the stderr I/O
+# so log writes never block the event loop or the model pool
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter('%(message)s'))  # Final formatting happens in the listener
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler])
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
@@ -33,6 +46,34 @@ app.add_middleware(
 # Include routers
 app.include_router(forecast_router, tags=["forecast"])
 
+def warmup_models():
+    """
+    Fit tiny ARIMA and XGBoost models once so statsmodels' compiled routines, the xgboost
+    shared library and the numba kernels (features and metrics) are loaded and compiled
+    before the first request
+    """
+    from models.arima import ARIMAForecaster
+    from models.xgboost_model import XGBoostForecaster
+    from services.metrics import calculate_metrics
+    
+    series = pd.Series(
+        100 + 10 * np.sin(np.arange(60) * 2 * np.pi / 7),
+        index=pd.date_range('2020-01-01', periods=60, freq='D')
+    )
+    ARIMAForecaster().fit_predict(series, 3)
+    predictions = XGBoostForecaster().fit_predict(series, 3, granularity='daily')
+    calculate_metrics(series.to_numpy()[-3:], predictions)
+
+@app.on_event("startup")
+async def warmup():
+    """Move model cold-start cost out of the first request's latency"""
+    start = time.perf_counter()
+    try:
+        warmup_models()
+        logger.info(f"Model warmup completed in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        logger.warning(f"Model warmup failed: {e}")
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -52,4 +93,19 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Worker processes: one by default. A single process keeps the dataset, preprocessed and
+    # result caches shared across requests, runs the model warmup once, and parallelizes fits
+    # on the MODEL_POOL threads (sized to the cores in routes/forecast.py). WEB_CONCURRENCY=N
+    # trades that for N processes, each with its own caches and warmup; the pool is then split
+    # so threads stay at about one per core (os.cpu_count() is the host's, not a cgroup quota).
+    # uvloop/httptools for faster I/O; log_config=None keeps uvicorn on the queue-based root
+    # logger configured above.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", 1)),
+        loop="uvloop",
+        http="httptools",
+        log_config=None
+    )
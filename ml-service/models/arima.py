@@ -1,14 +1,96 @@
 import pandas as pd
 import numpy as np
+from functools import lru_cache
+from typing import Optional, Tuple
 from statsmodels.tsa.statespace.sarimax import SARIMAX
 from statsmodels.tsa.stattools import adfuller, acf
-from statsmodels.tsa.seasonal import seasonal_decompose
 import logging
 import warnings
 
 warnings.filterwarnings('ignore')
 logger = logging.getLogger(__name__)
 
+# Non-seasonal (p, q) candidates with p + q <= 2, Hyndman-style small search space
+ORDER_POOL = [(0, 0), (1, 0), (0, 1), (2, 0), (0, 2), (1, 1)]
+
+# Seasonal SARIMA is expensive to fit; only use it for strong, well-covered seasonality
+MIN_SEASONAL_ACF = 0.5
+MIN_SEASONAL_CYCLES = 3
+
+def _fit_maxiter(n_obs: int) -> int:
+    """Optimizer iterations for a non-seasonal fit, adaptive to data size"""
+    return 75 if n_obs > 200 else 50
+
+def _periodogram_seasonal_strength(values: np.ndarray, period: int) -> float:
+    """
+    Share of the series' standard deviation carried by the seasonal harmonics
+    
+    FFT stand-in for std(seasonal_decompose(...).seasonal) / std(values): the power at
+    the harmonics of n / period in the linearly detrended series, as a standard deviation
+    relative to the raw series. O(n log n) with no decomposition or DataFrame allocations.
+    """
+    n = len(values)
+    t = np.arange(n) - (n - 1) / 2.0  # Centered time, so the least-squares slope is closed form
+    detrended = values - values.mean() - (t @ values / (t @ t)) * t
+    power = np.abs(np.fft.rfft(detrended)) ** 2
+    
+    harmonics = np.rint(np.arange(1, period // 2 + 1) * n / period).astype(np.intp)
+    bins = np.unique(np.clip(harmonics, 1, len(power) - 1))
+    seasonal_var = 2 * power[bins].sum() / (n * (n - 1))
+    
+    total_std = np.std(values, ddof=1)
+    return float(np.sqrt(seasonal_var) / total_std) if total_std > 0 else 0.0
+
+@lru_cache(maxsize=64)
+def _detect_seasonality_cached(values_bytes: bytes, freq: Optional[str]) -> Tuple[int, float, Optional[float]]:
+    """
+    ACF candidate scan plus periodogram strength check for ARIMAForecaster.detect_seasonality
+    
+    Returns:
+        (best_period, best_acf, seasonal_strength); seasonal_strength is None when
+        the strength check was skipped
+    """
+    values = np.frombuffer(values_bytes, dtype=np.float64)
+    observed = values[~np.isnan(values)]
+    
+    # Calculate autocorrelation
+    nlags = min(len(values) // 2, 50)
+    acf_values = acf(observed, nlags=nlags, fft=True)
+    
+    # Check common seasonal periods based on data frequency
+    if freq and 'D' in freq:
+        # Daily data: check for weekly (7), bi-weekly (14), monthly (30)
+        candidates = [7, 14, 30]
+    elif freq and 'W' in freq:
+        # Weekly data: check for monthly (4), quarterly (13), yearly (52)
+        candidates = [4, 13, 52]
+    elif freq and ('M' in freq or 'MS' in freq):
+        # Monthly data: check for quarterly (3), semi-annual (6), yearly (12)
+        candidates = [3, 6, 12]
+    else:
+        candidates = [7, 12, 30]  # Default candidates
+    
+    # Filter candidates that are within our data range
+    candidates = np.array([c for c in candidates if c < len(acf_values)], dtype=np.intp)
+    
+    # Find the candidate with strongest autocorrelation (single vectorized lookup)
+    best_period = 0
+    best_acf = 0.3  # Minimum threshold for seasonality
+    
+    if len(candidates):
+        scores = acf_values[candidates]
+        best_idx = int(scores.argmax())
+        if scores[best_idx] > best_acf:
+            best_acf = scores[best_idx]
+            best_period = int(candidates[best_idx])
+    
+    # Additional validation: seasonal strength from the periodogram if we found a period
+    seasonal_strength = None
+    if best_period > 0 and len(values) >= 2 * best_period:
+        seasonal_strength = _periodogram_seasonal_strength(observed, best_period)
+    
+    return (best_period, float(best_acf), seasonal_strength)
+
 class ARIMAForecaster:
     """
     ARIMA (AutoRegressive Integrated Moving Average) forecasting
@@ -23,83 +105,39 @@ class ARIMAForecaster:
         self.order = order
         self.seasonal_order = seasonal_order
         self.model = None
+        self._order_fit = None  # Best non-seasonal fit from auto_select_order (the final fit if no seasonality)
         
     def detect_seasonality(self, data: pd.Series) -> tuple:
         """
         Automatically detect seasonal period and strength using ACF analysis
         
         Returns:
-            (seasonal_period, has_seasonality) tuple
+            (seasonal_period, has_seasonality, acf_strength) tuple
         """
         try:
             # Need at least 2 full seasonal cycles for reliable detection
             if len(data) < 20:
-                return (0, False)
+                return (0, False, 0.0)
             
-            # Calculate autocorrelation
-            nlags = min(len(data) // 2, 50)
-            acf_values = acf(data.dropna(), nlags=nlags, fft=True)
-            
-            # Find peaks in ACF (potential seasonal periods)
-            # Look for significant autocorrelation (> 0.3) at regular intervals
-            potential_periods = []
-            
-            # Check common seasonal periods based on data frequency
+            freq = None
             if isinstance(data.index, pd.DatetimeIndex):
                 freq = data.index.freqstr or pd.infer_freq(data.index)
-                
-                if freq and 'D' in freq:
-                    # Daily data: check for weekly (7), bi-weekly (14), monthly (30)
-                    candidates = [7, 14, 30]
-                elif freq and 'W' in freq:
-                    # Weekly data: check for monthly (4), quarterly (13), yearly (52)
-                    candidates = [4, 13, 52]
-                elif freq and ('M' in freq or 'MS' in freq):
-                    # Monthly data: check for quarterly (3), semi-annual (6), yearly (12)
-                    candidates = [3, 6, 12]
-                else:
-                    candidates = [7, 12, 30]  # Default candidates
-            else:
-                candidates = [7, 12, 30]
             
-            # Filter candidates that are within our data range
-            candidates = [c for c in candidates if c < len(acf_values)]
-            
-            # Find the candidate with strongest autocorrelation
-            best_period = 0
-            best_acf = 0.3  # Minimum threshold for seasonality
-            
-            for period in candidates:
-                if acf_values[period] > best_acf:
-                    best_acf = acf_values[period]
-                    best_period = period
+            # Cached per (values, frequency): repeat requests for the same dataset skip ACF/decomposition
+            values = np.ascontiguousarray(data.to_numpy(dtype=np.float64))
+            best_period, best_acf, seasonal_strength = _detect_seasonality_cached(values.tobytes(), freq)
             
             has_seasonality = best_period > 0
-            
-            # Additional validation: try seasonal decomposition if we found a period
-            if has_seasonality and len(data) >= 2 * best_period:
-                try:
-                    decomposition = seasonal_decompose(
-                        data.dropna(), 
-                        model='additive', 
-                        period=best_period,
-                        extrapolate_trend='freq'
-                    )
-                    # Check if seasonal component has meaningful variance
-                    seasonal_strength = decomposition.seasonal.std() / data.std()
-                    if seasonal_strength < 0.1:  # Seasonal component too weak
-                        has_seasonality = False
-                        best_period = 0
-                except:
-                    # Decomposition failed, fall back to ACF result
-                    pass
+            if seasonal_strength is not None and seasonal_strength < 0.1:  # Seasonal component too weak
+                has_seasonality = False
+                best_period = 0
             
             logger.info(f"Seasonality detection: period={best_period}, strength={best_acf:.3f}, has_seasonality={has_seasonality}")
-            return (best_period, has_seasonality)
+            return (best_period, has_seasonality, float(best_acf))
             
         except Exception as e:
             logger.warning(f"Seasonality detection failed: {e}, assuming no seasonality")
-            return (0, False)
+            return (0, False, 0.0)
     
     def auto_select_order(self, data: pd.Series) -> tuple:
         """
@@ -109,27 +147,73 @@ class ARIMAForecaster:
         adf_result = adfuller(data.dropna())
         is_stationary = adf_result[1] < 0.05
         
-        # Standard orders
         d = 0 if is_stationary else 1
-        p, q = 1, 1
         
         # Detect seasonality automatically
-        seasonal_period, has_seasonality = self.detect_seasonality(data)
+        seasonal_period, has_seasonality, seasonal_acf = self.detect_seasonality(data)
         
         if has_seasonality and seasonal_period > 0:
-            # Only use SARIMA if we have enough data (at least 2 seasonal cycles)
-            if len(data) >= 2 * seasonal_period:
+            # Only pay for SARIMA on strong seasonality with enough cycles to estimate it
+            min_length = MIN_SEASONAL_CYCLES * seasonal_period
+            if seasonal_acf > MIN_SEASONAL_ACF and len(data) >= min_length:
                 self.seasonal_order = (1, 1, 1, seasonal_period)
                 logger.info(f"Using SARIMA with seasonal period {seasonal_period}")
+            elif seasonal_acf <= MIN_SEASONAL_ACF:
+                self.seasonal_order = (0, 0, 0, 0)
+                logger.info(f"Seasonality too weak for SARIMA (ACF={seasonal_acf:.3f}), using ARIMA")
             else:
                 self.seasonal_order = (0, 0, 0, 0)
-                logger.info(f"Insufficient data for SARIMA (need {2*seasonal_period}, have {len(data)}), using ARIMA")
+                logger.info(f"Insufficient data for SARIMA (need {min_length}, have {len(data)}), using ARIMA")
         else:
             self.seasonal_order = (0, 0, 0, 0)
             logger.info("No significant seasonality detected, using ARIMA")
         
+        # Select (p, q) by AIC over a small pool of non-seasonal fits. Without seasonality the
+        # winner is the final model, so candidates get the final fit's maxiter and it is reused
+        # as-is; otherwise it only warm-starts SARIMA and a cheap fit is enough.
+        p, q = 1, 1
+        best_aic = np.inf
+        self._order_fit = None
+        maxiter = 25 if self.seasonal_order[3] > 0 else _fit_maxiter(len(data))
+        for cand_p, cand_q in ORDER_POOL:
+            try:
+                candidate = SARIMAX(
+                    data,
+                    order=(cand_p, d, cand_q),
+                    enforce_stationarity=False,
+                    enforce_invertibility=False
+                ).fit(disp=False, maxiter=maxiter, cov_type='none')
+            except Exception:
+                continue
+            if candidate.aic < best_aic:
+                best_aic = candidate.aic
+                p, q = cand_p, cand_q
+                self._order_fit = candidate
+        
         logger.info(f"Auto-selected orders - ARIMA: ({p}, {d}, {q}), Seasonal: {self.seasonal_order}")
         return (p, d, q)
+    
+    def _warm_start_params(self, data: pd.Series) -> np.ndarray:
+        """
+        Start parameters for self.model seeded from the non-seasonal ARIMA MLE
+        
+        The non-seasonal AR/MA coefficients are copied by name from the ARIMA fit; seasonal
+        terms and sigma2 keep statsmodels' default (Hannan-Rissanen style) start values.
+        """
+        arima_fit = self._order_fit
+        if arima_fit is None or tuple(arima_fit.model.order) != tuple(self.order):
+            arima_fit = SARIMAX(
+                data,
+                order=self.order,
+                enforce_stationarity=False,
+                enforce_invertibility=False
+            ).fit(disp=False, maxiter=50, cov_type='none')
+        
+        fitted_params = dict(zip(arima_fit.model.param_names, np.asarray(arima_fit.params)))
+        return np.array([
+            fitted_params[name] if name.startswith(('ar.L', 'ma.L')) and name in fitted_params else default
+            for name, default in zip(self.model.param_names, self.model.start_params)
+        ])
         
     def fit_predict(
         self,
@@ -145,60 +229,45 @@ class ARIMAForecaster:
             if auto_order:
                 self.order = self.auto_select_order(data)
             
-            # Use seasonal_order if detected or provided
-            self.model = SARIMAX(
-                data,
-                order=self.order,
-                seasonal_order=self.seasonal_order,
-                enforce_stationarity=False,
-                enforce_invertibility=False
-            )
-            
-            # Adaptive maxiter based on data size and model complexity
             is_seasonal = self.seasonal_order[3] > 0
-            data_size = len(data)
+            order_fit = self._order_fit if auto_order else None
             
-            # More iterations for seasonal models and larger datasets
-            if is_seasonal and data_size > 100:
-                maxiter = 100
-            elif is_seasonal:
-                maxiter = 75
-            elif data_size > 200:
-                maxiter = 75
+            if not is_seasonal and order_fit is not None and tuple(order_fit.model.order) == tuple(self.order):
+                # auto_select_order already fitted exactly this model (same spec and maxiter)
+                self.model = order_fit.model
+                fitted_model = order_fit
             else:
-                maxiter = 50
-            
-            try:
-                fitted_model = self.model.fit(disp=False, maxiter=maxiter)
-            except:
-                # Fallback to non-seasonal if SARIMA fails (common on very short series)
-                logger.warning("SARIMA fit failed, falling back to basic ARIMA")
-                self.model = SARIMAX(data, order=self.order)
-                fitted_model = self.model.fit(disp=False, maxiter=50)
+                # Use seasonal_order if detected or provided
+                self.model = SARIMAX(
+                    data,
+                    order=self.order,
+                    seasonal_order=self.seasonal_order,
+                    enforce_stationarity=False,
+                    enforce_invertibility=False
+                )
+                
+                # Only point forecasts are used, so skip the parameter covariance (cov_type='none')
+                try:
+                    if is_seasonal:
+                        # Seasonal fits are warm-started so need fewer iterations
+                        fitted_model = self.model.fit(
+                            start_params=self._warm_start_params(data),
+                            method='lbfgs',
+                            maxiter=50,
+                            cov_type='none',
+                            disp=False
+                        )
+                    else:
+                        fitted_model = self.model.fit(disp=False, maxiter=_fit_maxiter(len(data)), cov_type='none')
+                except:
+                    # Fallback to non-seasonal if SARIMA fails (common on very short series)
+                    logger.warning("SARIMA fit failed, falling back to basic ARIMA")
+                    self.model = SARIMAX(data, order=self.order)
+                    fitted_model = self.model.fit(disp=False, maxiter=50, cov_type='none')
             
             # Generate forecast
-            forecast = fitted_model.forecast(steps=horizon)
-            predictions = forecast.values
-            
-            # --- SAFETY RAILS ---
-            # 1. Non-negative
-            predictions = np.maximum(predictions, 0)
+            predictions = self._apply_safety_rails(fitted_model.forecast(steps=horizon).values, data, horizon)
             
-            # 2. Divergence Check: If predictions are astronomical (e.g. > 100x max historical)
-            # this indicates an unstable model (unit root explosion).
-            if not data.empty:
-                historical_max = data.max()
-                # Use a larger threshold if max is 0
-                threshold = max(historical_max * 100, 1e9)
-                
-                if np.any(predictions > threshold):
-                    logger.warning(f"Divergence detected in ARIMA! Prediction reached {np.max(predictions)}. Falling back to naive.")
-                    last_value = data.iloc[-1]
-                    return np.full(horizon, last_value)
-                
-                # 3. Soft Cap: Even if not exploding, cap at a reasonable multiple for safety
-                predictions = np.minimum(predictions, historical_max * 10)
-
             logger.info(f"ARIMA forecast completed: {len(predictions)} predictions")
             return predictions
             
@@ -208,3 +277,27 @@ class ARIMAForecaster:
             logger.warning("Falling back to naive forecast")
             last_value = data.iloc[-1] if not data.empty else 0
             return np.full(horizon, last_value)
+    
+    def _apply_safety_rails(self, predictions: np.ndarray, data: pd.Series, horizon: int) -> np.ndarray:
+        """
+        Clamp raw forecasts: non-negative, naive fallback on divergence, soft cap
+        """
+        # 1. Non-negative
+        predictions = np.maximum(predictions, 0)
+        
+        # 2. Divergence Check: If predictions are astronomical (e.g. > 100x max historical)
+        # this indicates an unstable model (unit root explosion).
+        if not data.empty:
+            historical_max = data.max()
+            # Use a larger threshold if max is 0
+            threshold = max(historical_max * 100, 1e9)
+            
+            if np.any(predictions > threshold):
+                logger.warning(f"Divergence detected in ARIMA! Prediction reached {np.max(predictions)}. Falling back to naive.")
+                last_value = data.iloc[-1]
+                return np.full(horizon, last_value)
+            
+            # 3. Soft Cap: Even if not exploding, cap at a reasonable multiple for safety
+            predictions = np.minimum(predictions, historical_max * 10)
+        
+        return predictions
@@ -44,14 +44,15 @@ class BaselineForecaster:
             
         elif self.method == 'seasonal_naive':
             # Repeat last season's pattern
-            predictions = []
-            for i in range(horizon):
-                idx = -(seasonal_period - (i % seasonal_period))
-                if abs(idx) <= len(data):
-                    predictions.append(data.iloc[idx])
-                else:
-                    predictions.append(data.iloc[-1])
-            predictions = np.array(predictions)
+            values = data.to_numpy()
+            if len(values) >= seasonal_period:
+                season = values[-seasonal_period:]
+            else:
+                # Not a full season yet: pad the missing leading positions with the last value
+                season = np.full(seasonal_period, values[-1], dtype=values.dtype)
+                season[seasonal_period - len(values):] = values
+            n_seasons = (horizon + seasonal_period - 1) // seasonal_period
+            predictions = np.tile(season, n_seasons)[:horizon]
             
         elif self.method == 'moving_average':
             # Simple moving average
@@ -1,11 +1,225 @@
 import pandas as pd
 import numpy as np
+from typing import List, Optional, Tuple
+import bottleneck as bn
+from numba import njit
 from xgboost import XGBRegressor
-from sklearn.preprocessing import StandardScaler
+from utils.jit import FASTMATH
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Order of the calendar features written by _advance_feature_row
+_CALENDAR_FEATURES = (
+    'day_of_week', 'day_of_month', 'month', 'quarter', 'year',
+    'is_weekend', 'is_month_start', 'is_month_end', 'is_quarter_end'
+)
+
+_DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+
+@njit(cache=True)
+def _ewm_mean(values, alpha):
+    """
+    Exponential moving average matching pandas ewm(alpha=alpha, adjust=False, ignore_na=False).mean()
+    """
+    out = np.empty_like(values)
+    weighted = values[0]
+    old_wt = 1.0
+    out[0] = weighted
+    for i in range(1, values.shape[0]):
+        cur = values[i]
+        is_observation = cur == cur
+        if weighted == weighted:
+            old_wt *= 1.0 - alpha
+            if is_observation:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif is_observation:
+            weighted = cur
+        out[i] = weighted
+    return out
+
+@njit(cache=True, fastmath=FASTMATH)
+def _advance_feature_row(tail, t, day, lags, lag_pos, windows, window_sums, stat_pos,
+                         ema_alpha, ema_state, ema_pos, roc_pos, calendar_pos, lag1_dow_pos,
+                         mean, scale, raw, out):
+    """
+    Advance the online feature state to observation t and write the scaled feature row into out
+
+    tail is a ring buffer holding observation i at slot i % len(tail), long enough for the
+    longest lag and rolling window. Mirrors the last row of XGBoostForecaster.create_features;
+    day is days since the epoch.
+    """
+    size = tail.shape[0]
+    raw[:] = np.nan
+    prev = np.float64(tail[(t - 1) % size])
+
+    # Lag features
+    for k in range(lags.shape[0]):
+        if lag_pos[k] >= 0 and t >= lags[k]:
+            raw[lag_pos[k]] = tail[(t - lags[k]) % size]
+
+    # Rolling statistics over observations [t - window, t), via running sums
+    for k in range(windows.shape[0]):
+        window = windows[k]
+        if t - 1 >= window:
+            oldest = np.float64(tail[(t - 1 - window) % size])
+            window_sums[k, 0] -= oldest
+            window_sums[k, 1] -= oldest * oldest
+        window_sums[k, 0] += prev
+        window_sums[k, 1] += prev * prev
+
+        if t >= window:
+            total = window_sums[k, 0]
+            window_mean = total / window
+            var = (window_sums[k, 1] - total * window_mean) / (window - 1)
+            lo = prev
+            hi = prev
+            for i in range(t - window, t - 1):
+                value = tail[i % size]
+                lo = min(lo, value)
+                hi = max(hi, value)
+            if stat_pos[k, 0] >= 0:
+                raw[stat_pos[k, 0]] = window_mean
+            if stat_pos[k, 1] >= 0:
+                raw[stat_pos[k, 1]] = np.sqrt(max(var, 0.0))
+            if stat_pos[k, 2] >= 0:
+                raw[stat_pos[k, 2]] = lo
+            if stat_pos[k, 3] >= 0:
+                raw[stat_pos[k, 3]] = hi
+
+    # Exponential moving averages (adjust=False recurrence)
+    for k in range(ema_alpha.shape[0]):
+        ema_state[k] = ema_alpha[k] * prev + (1.0 - ema_alpha[k]) * ema_state[k]
+        if ema_pos[k] >= 0:
+            raw[ema_pos[k]] = ema_state[k]
+
+    # Rate of change (pct_change semantics: x/0 -> inf, 0/0 -> NaN)
+    if roc_pos >= 0 and t >= 7:
+        raw[roc_pos] = tail[t % size] / tail[(t - 7) % size] - 1.0
+
+    # Calendar features from the civil date (Hinnant's days -> y/m/d)
+    z = day + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    dom = doy - (153 * mp + 2) // 5 + 1
+    month = mp + 3 if mp < 10 else mp - 9
+    year = yoe + era * 400 + (1 if month <= 2 else 0)
+    dow = (day + 3) % 7
+    days_in_month = _DAYS_IN_MONTH[month - 1]
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        days_in_month = 29
+
+    calendar = (
+        dow, dom, month, (month - 1) // 3 + 1, year,
+        1 if dow >= 5 else 0,
+        1 if dom <= 7 else 0,
+        1 if dom >= days_in_month - 7 else 0,
+        1 if month % 3 == 0 else 0
+    )
+    for k in range(calendar_pos.shape[0]):
+        if calendar_pos[k] >= 0:
+            raw[calendar_pos[k]] = calendar[k]
+    if lag1_dow_pos >= 0:
+        raw[lag1_dow_pos] = prev * dow
+
+    # Standard scaling
+    for i in range(raw.shape[0]):
+        out[i] = (raw[i] - mean[i]) / scale[i]
+
+class FeatureState:
+    """
+    Online feature state for recursive forecasting
+    
+    Holds only the tail of the series needed for the next feature row (longest lag or
+    rolling window), running window sums and EMA scalars, so each step costs O(|features|)
+    regardless of series length.
+    """
+    
+    def __init__(
+        self,
+        observed: np.ndarray,
+        feature_cols: List[str],
+        last_row: np.ndarray,
+        lag_periods: List[int],
+        rolling_windows: List[int],
+        mean: np.ndarray,
+        scale: np.ndarray
+    ):
+        """
+        Args:
+            observed: Observed target values
+            feature_cols: Model feature columns, in training order
+            last_row: Unscaled feature row of the last observation (from create_features)
+            lag_periods: Lag periods used by create_features
+            rolling_windows: Rolling windows used by create_features
+            mean: Per-feature standardization mean
+            scale: Per-feature standardization scale
+        """
+        position = {col: i for i, col in enumerate(feature_cols)}
+        
+        # Ring buffer sized so the oldest value leaving the longest window is still held
+        size = max(max(lag_periods) + 1, max(rolling_windows) + 2, 8)
+        self._t = len(observed) - 1
+        self._tail = np.zeros(size)
+        for i in range(max(len(observed) - size, 0), len(observed)):
+            self._tail[i % size] = observed[i]
+        
+        self._lags = np.array(lag_periods, dtype=np.int64)
+        self._lag_pos = np.array([position.get(f'lag_{lag}', -1) for lag in lag_periods], dtype=np.int64)
+        
+        # Window sums over the values preceding the last observation, matching shift(1).rolling(window)
+        self._windows = np.array(rolling_windows, dtype=np.int64)
+        self._window_sums = np.zeros((len(rolling_windows), 2))
+        self._stat_pos = np.full((len(rolling_windows), 4), -1, dtype=np.int64)
+        for k, window in enumerate(rolling_windows):
+            values = np.asarray(observed[max(self._t - window, 0):self._t], dtype=np.float64)
+            self._window_sums[k] = (values.sum(), (values * values).sum())
+            for j, stat in enumerate(('mean', 'std', 'min', 'max')):
+                self._stat_pos[k, j] = position.get(f'rolling_{stat}_{window}', -1)
+        
+        spans = (7, 30)
+        self._ema_alpha = np.array([2.0 / (span + 1) for span in spans])
+        self._ema_pos = np.array([position.get(f'ema_{span}', -1) for span in spans], dtype=np.int64)
+        self._ema_state = np.array([last_row[pos] if pos >= 0 else 0.0 for pos in self._ema_pos])
+        
+        self._roc_pos = position.get('roc_7', -1)
+        self._calendar_pos = np.array([position.get(col, -1) for col in _CALENDAR_FEATURES], dtype=np.int64)
+        self._lag1_dow_pos = position.get('lag1_x_dow', -1)
+        
+        self._mean = mean
+        self._scale = scale
+        self._raw = np.empty(len(feature_cols))
+        self._row = np.empty((1, len(feature_cols)), dtype=np.float32)
+        self._row[0] = (last_row - mean) / scale
+    
+    def row(self) -> np.ndarray:
+        """Current scaled feature row as a (1, n_features) float32 buffer (reused between steps)"""
+        return self._row
+    
+    def push(self, value: float, next_day: int):
+        """
+        Append the value observed (or predicted) at next_day and advance the feature row
+        
+        Args:
+            value: Target value of the next period
+            next_day: Date of the next period as days since the epoch
+        """
+        self._t += 1
+        self._tail[self._t % len(self._tail)] = value
+        _advance_feature_row(
+            self._tail, self._t, next_day,
+            self._lags, self._lag_pos,
+            self._windows, self._window_sums, self._stat_pos,
+            self._ema_alpha, self._ema_state, self._ema_pos,
+            self._roc_pos, self._calendar_pos, self._lag1_dow_pos,
+            self._mean, self._scale, self._raw, self._row[0]
+        )
+
 class XGBoostForecaster:
     """
     XGBoost forecasting with feature engineering
@@ -20,15 +234,14 @@ class XGBoostForecaster:
         self.n_lags = n_lags
         self.n_estimators = n_estimators
         self.model = None
-        self.scaler = StandardScaler()
+        self._booster = None
+        self._mean = None  # Per-feature standardization, fused into the prediction path
+        self._scale = None
         
-    def create_features(self, data: pd.DataFrame, target_col: str = 'sales', granularity: str = 'daily') -> pd.DataFrame:
+    def _feature_periods(self, granularity: str) -> Tuple[List[int], List[int]]:
         """
-        Create lag features and rolling statistics with adaptive selection based on granularity
+        Adaptive lag and rolling window selection based on granularity
         """
-        df = data.copy()
-        
-        # Adaptive lag selection based on granularity
         if granularity == 'daily':
             lag_periods = [1, 7, 14, 30]  # 1 day, 1 week, 2 weeks, 1 month
             rolling_windows = [3, 7, 14, 30]
@@ -41,25 +254,40 @@ class XGBoostForecaster:
         else:
             lag_periods = list(range(1, min(self.n_lags + 1, 8)))
             rolling_windows = [3, 7, 14]
+        return lag_periods, rolling_windows
+    
+    def create_features(self, data: pd.DataFrame, target_col: str = 'sales', granularity: str = 'daily') -> pd.DataFrame:
+        """
+        Create lag features and rolling statistics with adaptive selection based on granularity
+        """
+        df = data.copy()
+        
+        # float32 halves memory traffic through the feature pipeline; XGBoost trains in float32 anyway
+        df[target_col] = df[target_col].astype(np.float32)
+        
+        lag_periods, rolling_windows = self._feature_periods(granularity)
         
         # Lag features
         for lag in lag_periods:
             if lag <= len(df):
                 df[f'lag_{lag}'] = df[target_col].shift(lag)
         
+        # Shifted target materialized once for the moving-window kernels
+        shifted = df[target_col].shift(1).to_numpy(dtype=np.float32)
+        
         # Rolling statistics (only if we have enough data)
         for window in rolling_windows:
             if len(df) >= window:
-                df[f'rolling_mean_{window}'] = df[target_col].shift(1).rolling(window=window).mean()
-                df[f'rolling_std_{window}'] = df[target_col].shift(1).rolling(window=window).std()
-                df[f'rolling_min_{window}'] = df[target_col].shift(1).rolling(window=window).min()
-                df[f'rolling_max_{window}'] = df[target_col].shift(1).rolling(window=window).max()
+                df[f'rolling_mean_{window}'] = bn.move_mean(shifted, window=window, min_count=window)
+                df[f'rolling_std_{window}'] = bn.move_std(shifted, window=window, min_count=window, ddof=1)
+                df[f'rolling_min_{window}'] = bn.move_min(shifted, window=window, min_count=window)
+                df[f'rolling_max_{window}'] = bn.move_max(shifted, window=window, min_count=window)
         
         # Exponential moving average (trend indicator)
         if len(df) >= 7:
-            df['ema_7'] = df[target_col].shift(1).ewm(span=7, adjust=False).mean()
+            df['ema_7'] = _ewm_mean(shifted, 2.0 / (7 + 1))
         if len(df) >= 30:
-            df['ema_30'] = df[target_col].shift(1).ewm(span=30, adjust=False).mean()
+            df['ema_30'] = _ewm_mean(shifted, 2.0 / (30 + 1))
         
         # Trend features
         if len(df) >= 7:
@@ -85,12 +313,50 @@ class XGBoostForecaster:
                 df['lag1_x_dow'] = df['lag_1'] * df['day_of_week']
         
         return df
+
+    def prepare_features(
+        self,
+        data: pd.Series,
+        granularity: str = 'daily'
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, List[str], np.ndarray]]:
+        """
+        Build the training matrix for a series once, so several fits on it can share it
+        
+        Args:
+            data: Historical time series data
+            granularity: Time granularity
+            
+        Returns:
+            Tuple of (X, y, feature_cols, last_row): row-major float32 training features and
+            target, the feature names, and the feature row of the last observation; None if
+            fewer than 10 rows have every feature
+        """
+        # Convert to DataFrame
+        df = pd.DataFrame({'sales': data})
+        
+        # Create features
+        df = self.create_features(df, granularity=granularity)
+        
+        # Drop rows with NaN (from lag features)
+        df_clean = df.dropna()
+        
+        if len(df_clean) < 10:
+            return None
+        
+        # Prepare training data (row-major, the layout XGBoost ingests)
+        feature_cols = [col for col in df_clean.columns if col != 'sales']
+        X = np.ascontiguousarray(df_clean[feature_cols].to_numpy(dtype=np.float32))
+        y = df_clean['sales'].to_numpy(dtype=np.float32)
+        last_row = df[feature_cols].iloc[-1].to_numpy(dtype=np.float64)
+        
+        return X, y, feature_cols, last_row
     
     def fit_predict(
         self,
         data: pd.Series,
         horizon: int,
-        granularity: str = 'daily'
+        granularity: str = 'daily',
+        precomputed_features: Optional[Tuple[np.ndarray, np.ndarray, List[str], np.ndarray]] = None
     ) -> np.ndarray:
         """
         Fit XGBoost model and generate predictions
@@ -98,70 +364,82 @@ class XGBoostForecaster:
         Args:
             data: Historical time series data
             horizon: Number of periods to forecast
+            granularity: Time granularity
+            precomputed_features: prepare_features output for the same data and granularity
             
         Returns:
             Array of predictions
         """
         try:
-            # Convert to DataFrame
-            df = pd.DataFrame({'sales': data})
-            
-            # Create features
-            df = self.create_features(df, granularity=granularity)
-            
-            # Drop rows with NaN (from lag features)
-            df_clean = df.dropna()
+            features = precomputed_features
+            if features is None:
+                features = self.prepare_features(data, granularity=granularity)
             
-            if len(df_clean) < 10:
+            if features is None:
                 logger.warning("Insufficient data for XGBoost, falling back to naive")
                 return np.full(horizon, data.iloc[-1])
             
-            # Prepare training data
-            feature_cols = [col for col in df_clean.columns if col != 'sales']
-            X = df_clean[feature_cols]
-            y = df_clean['sales']
+            X, y, feature_cols, last_row = features
             
-            # Scale features
-            X_scaled = self.scaler.fit_transform(X)
+            # Scale features (StandardScaler semantics: population std, constant columns left unscaled)
+            if not np.isfinite(X).all():
+                raise ValueError("Input X contains infinity or a value too large for dtype('float32').")
+            self._mean = X.mean(axis=0, dtype=np.float64)
+            self._scale = X.std(axis=0, dtype=np.float64)
+            self._scale[self._scale == 0] = 1.0
+            X_scaled = ((X - self._mean) / self._scale).astype(np.float32)
             
             # Train model
             self.model = XGBRegressor(
                 n_estimators=self.n_estimators,
                 max_depth=5,
                 learning_rate=0.1,
+                tree_method='hist',
                 random_state=42,
                 verbosity=0
             )
             self.model.fit(X_scaled, y)
             
-            # Recursive forecasting
-            predictions = []
-            current_series = data.copy()
+            # Predict through the raw booster: no sklearn wrapper or DMatrix per step, and a
+            # single thread since each call scores one row
+            self._booster = self.model.get_booster()
+            self._booster.set_param({'nthread': 1})
             
-            # Identify frequency for date increment
-            freq = 'D'
+            # Recursive forecasting (float32, the booster's native output precision)
+            predictions = np.empty(horizon, dtype=np.float32)
+            
+            # Start from the last row of the bulk feature frame, then update it online
+            lag_periods, rolling_windows = self._feature_periods(granularity)
+            state = FeatureState(
+                data.to_numpy(dtype=np.float32), feature_cols, last_row,
+                lag_periods, rolling_windows, self._mean, self._scale
+            )
+            
+            # Identify frequency for date increment, resolved to a DateOffset once (never parsed per step)
+            offset = pd.tseries.frequencies.to_offset('D')
             if isinstance(data.index, pd.DatetimeIndex) and data.index.freq:
-                freq = data.index.freq
+                offset = data.index.freq
+            
+            # Dates of every step, generated once (day 0 is the last observation) so the loop stays pandas-free
+            if isinstance(data.index, pd.DatetimeIndex):
+                step_dates = pd.date_range(data.index[-1], periods=horizon, freq=offset)
+                if step_dates.tz is not None:
+                    # Calendar features are local wall-time fields, as in create_features
+                    step_dates = step_dates.tz_localize(None)
+                step_days = ((step_dates - pd.Timestamp(0)) // pd.Timedelta(days=1)).to_numpy(dtype=np.int64)
+            else:
+                step_days = np.zeros(horizon, dtype=np.int64)
             
             for step in range(horizon):
-                # Convert back to DataFrame to create features
-                temp_df = pd.DataFrame({'sales': current_series})
-                temp_df = self.create_features(temp_df, granularity=granularity)
-                
-                # Get last row features
-                last_row = temp_df.iloc[[-1]][feature_cols]
-                last_row_scaled = self.scaler.transform(last_row)
-                
                 # Predict
-                pred = self.model.predict(last_row_scaled)[0]
+                pred = self._booster.inplace_predict(state.row(), validate_features=False)[0]
                 pred = max(0, pred)  # Ensure non-negative
-                predictions.append(pred)
+                predictions[step] = pred
                 
-                # Update current_series for next iteration with correct index increment
-                new_date = current_series.index[-1] + pd.tseries.frequencies.to_offset(freq)
-                current_series[new_date] = pred
+                # Append the prediction and advance the feature row to the next date
+                if step < horizon - 1:
+                    state.push(pred, step_days[step + 1])
             
-            predictions = np.array(predictions)
             logger.info(f"XGBoost forecast completed: {len(predictions)} predictions")
             return predictions
             
@@ -1,7 +1,11 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field, HttpUrl
 from typing import List, Literal, Dict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
 import logging
+import os
 
 from services.forecast_service import forecast_service
 
@@ -9,6 +13,15 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Bounded pool for model fitting so CPU-bound work never runs on the event loop.
+# Threads (not processes) keep the in-process dataset cache shared across requests;
+# the heavy numeric work in statsmodels/xgboost releases the GIL. Each worker process
+# gets its share of the cores (see the worker trade-off in main.py).
+MODEL_POOL = ThreadPoolExecutor(
+    max_workers=max(1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", 1))),
+    thread_name_prefix="forecast"
+)
+
 class ForecastRequest(BaseModel):
     """Request model for forecast endpoint"""
     datasetUrl: str = Field(..., description="URL to dataset (S3 presigned URL)")
@@ -46,13 +59,18 @@ async def create_forecast(request: ForecastRequest):
     Returns predictions and accuracy metrics (MAE, RMSE, MAPE, Accuracy %)
     """
     try:
-        logger.info(f"Received forecast request: {request.modelType}, horizon={request.horizon}")
+        logger.debug(f"Received forecast request: {request.modelType}, horizon={request.horizon}")
         
-        result = forecast_service.run_forecast(
-            dataset_url=request.datasetUrl,
-            model_type=request.modelType,
-            horizon=request.horizon,
-            granularity=request.granularity
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            MODEL_POOL,
+            functools.partial(
+                forecast_service.run_forecast,
+                dataset_url=request.datasetUrl,
+                model_type=request.modelType,
+                horizon=request.horizon,
+                granularity=request.granularity
+            )
         )
         
         return result
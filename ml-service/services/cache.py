@@ -1,33 +1,108 @@
 import pandas as pd
 from typing import Dict, Tuple, Optional
+from collections import OrderedDict
 from functools import lru_cache
 import hashlib
 import logging
-from datetime import datetime, timedelta
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
-class DatasetCache:
+class TTLCache:
     """
-    Simple in-memory cache for datasets and preprocessed series
+    Simple in-memory TTL + LRU store shared by the dataset and result caches
+    
+    Entries are kept in access order, so expired and least recently used entries are
+    evicted from the front on every set; no periodic cleanup scan is needed. Subclasses
+    build the key and expose their own get/set.
     """
     
-    def __init__(self, ttl_seconds: int = 300):
+    def __init__(self, ttl_seconds: int, maxsize: int):
         """
         Args:
-            ttl_seconds: Time-to-live for cache entries (default 5 minutes)
+            ttl_seconds: Time-to-live for cache entries
+            maxsize: Maximum number of entries before the least recently used is evicted
         """
         self.ttl_seconds = ttl_seconds
-        self._cache: Dict[str, Tuple[any, datetime]] = {}
+        self.maxsize = maxsize
+        self._cache: OrderedDict[Tuple, Tuple[any, float]] = OrderedDict()  # key -> (data, monotonic deadline)
+        self._lock = threading.Lock()  # Forecasts run on a thread pool and share the caches
     
-    def _is_expired(self, timestamp: datetime) -> bool:
-        """Check if cache entry is expired"""
-        return datetime.now() - timestamp > timedelta(seconds=self.ttl_seconds)
+    def _is_expired(self, deadline: float) -> bool:
+        """Check if cache entry is expired (monotonic clock, immune to wall-clock jumps)"""
+        return time.monotonic() > deadline
+    
+    def _lookup(self, key: Tuple, label: str) -> Optional[any]:
+        """Return the live entry for key, dropping it if expired"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                data, deadline = entry
+                if not self._is_expired(deadline):
+                    self._cache.move_to_end(key)
+                    logger.debug(f"Cache HIT for {label} entry")
+                    return data
+                else:
+                    logger.debug(f"Cache EXPIRED for {label} entry")
+                    del self._cache[key]
+        
+        logger.debug(f"Cache MISS for {label} entry")
+        return None
     
-    def _generate_key(self, url: str, granularity: str = '') -> str:
-        """Generate cache key from URL and granularity"""
-        key_str = f"{url}:{granularity}"
-        return hashlib.md5(key_str.encode()).hexdigest()
+    def _store(self, key: Tuple, data: any, label: str):
+        """Insert data under key with a fresh deadline, evicting from the front"""
+        with self._lock:
+            self._cache[key] = (data, time.monotonic() + self.ttl_seconds)
+            self._cache.move_to_end(key)
+            
+            # Lazily drop expired entries at the front (amortized O(1) per set)
+            while self._cache:
+                _, (_, deadline) = next(iter(self._cache.items()))
+                if not self._is_expired(deadline):
+                    break
+                self._cache.popitem(last=False)
+            
+            # LRU bound
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        
+        logger.debug(f"Cached {label} entry (TTL: {self.ttl_seconds}s)")
+    
+    def clear(self):
+        """Clear all cache entries"""
+        with self._lock:
+            self._cache.clear()
+        logger.info("Cache cleared")
+    
+    def cleanup_expired(self):
+        """Remove all expired entries (full scan; set() already evicts expired entries at the front)"""
+        with self._lock:
+            expired_keys = [
+                key for key, (_, deadline) in self._cache.items()
+                if self._is_expired(deadline)
+            ]
+            for key in expired_keys:
+                del self._cache[key]
+        if expired_keys:
+            logger.info(f"Cleaned up {len(expired_keys)} expired cache entries")
+
+class DatasetCache(TTLCache):
+    """
+    In-memory cache for datasets and preprocessed series, keyed by URL and granularity
+    """
+    
+    def __init__(self, ttl_seconds: int = 300, maxsize: int = 64):
+        """
+        Args:
+            ttl_seconds: Time-to-live for cache entries (default 5 minutes)
+            maxsize: Maximum number of entries before the least recently used is evicted
+        """
+        super().__init__(ttl_seconds, maxsize)
+    
+    def _generate_key(self, url: str, granularity: str = '') -> Tuple[str, str]:
+        """Generate cache key from URL and granularity (used directly as the dict key, no hashing)"""
+        return (url, granularity)
     
     def get(self, url: str, granularity: str = '') -> Optional[any]:
         """
@@ -40,19 +115,7 @@ class DatasetCache:
         Returns:
             Cached data or None if not found/expired
         """
-        key = self._generate_key(url, granularity)
-        
-        if key in self._cache:
-            data, timestamp = self._cache[key]
-            if not self._is_expired(timestamp):
-                logger.info(f"Cache HIT for key {key[:8]}...")
-                return data
-            else:
-                logger.info(f"Cache EXPIRED for key {key[:8]}...")
-                del self._cache[key]
-        
-        logger.info(f"Cache MISS for key {key[:8]}...")
-        return None
+        return self._lookup(self._generate_key(url, granularity), granularity or 'default')
     
     def set(self, url: str, data: any, granularity: str = ''):
         """
@@ -63,25 +126,61 @@ class DatasetCache:
             data: Data to cache
             granularity: Data granularity
         """
-        key = self._generate_key(url, granularity)
-        self._cache[key] = (data, datetime.now())
-        logger.info(f"Cached data for key {key[:8]}... (TTL: {self.ttl_seconds}s)")
+        self._store(self._generate_key(url, granularity), data, granularity or 'default')
+
+class ForecastResultCache(TTLCache):
+    """
+    In-memory cache for finished forecast results, keyed by dataset content and model settings
+    """
     
-    def clear(self):
-        """Clear all cache entries"""
-        self._cache.clear()
-        logger.info("Cache cleared")
+    def __init__(self, ttl_seconds: int = 3600, maxsize: int = 256):
+        """
+        Args:
+            ttl_seconds: Time-to-live for cache entries (default 1 hour)
+            maxsize: Maximum number of entries before the least recently used is evicted
+        """
+        super().__init__(ttl_seconds, maxsize)
     
-    def cleanup_expired(self):
-        """Remove expired entries from cache"""
-        expired_keys = [
-            key for key, (_, timestamp) in self._cache.items()
-            if self._is_expired(timestamp)
-        ]
-        for key in expired_keys:
-            del self._cache[key]
-        if expired_keys:
-            logger.info(f"Cleaned up {len(expired_keys)} expired cache entries")
+    def get(self, dataset_hash: str, model_type: str, horizon: int, granularity: str) -> Optional[Dict]:
+        """
+        Get a cached forecast result
+        
+        Args:
+            dataset_hash: Content hash of the preprocessed series (see series_fingerprint)
+            model_type: Requested model type
+            horizon: Number of forecast periods
+            granularity: Time granularity
+            
+        Returns:
+            Cached result or None if not found/expired
+        """
+        return self._lookup((dataset_hash, model_type, horizon, granularity), f"{model_type} result")
+    
+    def set(self, dataset_hash: str, model_type: str, horizon: int, granularity: str, result: Dict):
+        """
+        Store a forecast result
+        
+        Args:
+            dataset_hash: Content hash of the preprocessed series (see series_fingerprint)
+            model_type: Requested model type
+            horizon: Number of forecast periods
+            granularity: Time granularity
+            result: Forecast result (predictions and metrics)
+        """
+        self._store((dataset_hash, model_type, horizon, granularity), result, f"{model_type} result")
+
+def series_fingerprint(*series: pd.Series) -> str:
+    """
+    Content hash of one or more time series (dates and values)
+    
+    Non-cryptographic use only; blake2b with a short digest is fast and in the stdlib.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for s in series:
+        digest.update(s.index.asi8.tobytes() if isinstance(s.index, pd.DatetimeIndex) else s.index.to_numpy().tobytes())
+        digest.update(s.to_numpy(dtype='float64').tobytes())
+    return digest.hexdigest()
 
-# Global cache instance
+# Global cache instances
 dataset_cache = DatasetCache(ttl_seconds=300)
+result_cache = ForecastResultCache(ttl_seconds=3600)
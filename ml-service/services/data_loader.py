@@ -1,13 +1,52 @@
 import pandas as pd
 import numpy as np
-from typing import Tuple
+from typing import Optional, Tuple
+import re
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pacsv
 import requests
 import logging
-from io import StringIO
+from io import BytesIO
 from services.cache import dataset_cache
 
 logger = logging.getLogger(__name__)
 
+# Resample frequency per granularity (month start to be consistent)
+GRANULARITY_FREQ = {'daily': 'D', 'weekly': 'W', 'monthly': 'MS'}
+
+# Column-name keywords for auto-detecting the date and value columns
+_DATE_COL_RE = re.compile(r'date|time|day|month|year', re.IGNORECASE)
+_VALUE_COL_RE = re.compile(r'sales|revenue|amount|value|price|quantity', re.IGNORECASE)
+
+# Date formats tried against a sample of the date column, in order (month-first before day-first,
+# matching pandas' default); 'ISO8601' covers ISO timestamps with times and offsets
+_DATE_FORMATS = [
+    '%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%Y/%m/%d', '%m-%d-%Y', '%d-%m-%Y', '%d.%m.%Y',
+    '%m/%d/%Y %H:%M', '%d/%m/%Y %H:%M', '%m/%d/%Y %H:%M:%S', '%d/%m/%Y %H:%M:%S', 'ISO8601'
+]
+
+# Smallest dataset worth forecasting, and the body size up to which a download is checked for
+# that many rows before parsing (Content-Length of the GET itself; presigned URLs reject HEAD)
+MIN_DATASET_ROWS = 10
+SMALL_BODY_BYTES = 64 * 1024
+
+# Plain decimal number, optionally signed and in exponent notation (after currency symbols are stripped)
+_NUMBER_PATTERN = r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$'
+
+def _to_frame(dataset) -> pd.DataFrame:
+    """
+    Materialize a cached dataset as a new DataFrame
+    
+    Preprocessing modifies columns in place, so every caller gets its own frame rather than
+    the cached object.
+    """
+    if isinstance(dataset, pa.Table):
+        # date32 columns come out as datetime64 rather than Python date objects, so they skip
+        # format detection and string parsing in preprocess_data
+        return dataset.to_pandas(split_blocks=True, date_as_object=False)
+    return dataset.copy()
+
 def load_data_from_url(url: str) -> pd.DataFrame:
     """
     Load CSV data from URL (S3 presigned URL or HTTP) with caching
@@ -20,25 +59,58 @@ def load_data_from_url(url: str) -> pd.DataFrame:
     """
     try:
         # Check cache first
-        cached_df = dataset_cache.get(url, granularity='raw')
-        if cached_df is not None:
-            logger.info(f"Using cached data: {len(cached_df)} rows")
-            return cached_df
+        cached_dataset = dataset_cache.get(url, granularity='raw')
+        if cached_dataset is not None:
+            df = _to_frame(cached_dataset)
+            logger.info(f"Using cached data: {len(df)} rows")
+            return df
         
         logger.info(f"Loading data from URL...")
         
-        # Download file
-        response = requests.get(url, timeout=60)
+        # Stream the body straight into Arrow's multi-threaded CSV reader (no in-memory copy of
+        # the payload, no unicode decode)
+        response = requests.get(url, stream=True, timeout=60)
         response.raise_for_status()
+        response.raw.decode_content = True  # Transparently gunzip Content-Encoding: gzip bodies
         
-        # Parse CSV
-        df = pd.read_csv(StringIO(response.text))
+        # Small bodies are read whole and rejected early if they cannot hold enough rows
+        # (header plus MIN_DATASET_ROWS non-empty lines), before any parsing
+        source, body = response.raw, None
+        content_length = response.headers.get('Content-Length')
+        if content_length is not None and int(content_length) <= SMALL_BODY_BYTES:
+            with response:
+                body = response.content
+            if sum(1 for line in body.splitlines() if line.strip()) <= MIN_DATASET_ROWS:
+                raise ValueError(f"Dataset too small (minimum {MIN_DATASET_ROWS} rows required)")
+            source = pa.BufferReader(body)
         
-        # Clean column names (remove BOMs and unexpected whitespace)
-        df.columns = df.columns.str.strip().str.replace('\ufeff', '')
+        try:
+            with response:
+                dataset = pacsv.read_csv(
+                    source,
+                    read_options=pacsv.ReadOptions(block_size=1 << 20, use_threads=True),
+                    # Plain YYYY-MM-DD values become date32 columns; anything with a time part is left as a
+                    # string for preprocess_data, since Arrow would convert offsets to UTC and shift the
+                    # local dates that get resampled
+                    convert_options=pacsv.ConvertOptions(strings_can_be_null=True, timestamp_parsers=['%Y-%m-%d'])
+                )
+            # Clean column names (remove BOMs and unexpected whitespace) on the schema, before conversion
+            dataset = dataset.rename_columns([name.lstrip('\ufeff').strip() for name in dataset.column_names])
+        except pa.ArrowInvalid as e:
+            # Irregular files (e.g. ragged rows) that only pandas' lenient parser accepts; a streamed
+            # body is already consumed, so fetch it again
+            logger.warning(f"Arrow CSV parse failed ({e}), falling back to pandas")
+            if body is None:
+                response = requests.get(url, timeout=60)
+                response.raise_for_status()
+                body = response.content
+            # Parse the raw bytes (no str decode of the whole payload), in the declared charset
+            dataset = pd.read_csv(BytesIO(body), encoding=response.encoding or 'utf-8')
+            dataset.columns = [name.lstrip('\ufeff').strip() for name in dataset.columns]
         
-        # Cache the result
-        dataset_cache.set(url, df, granularity='raw')
+        # Cache the result (the Arrow table itself: compact strings, immutable and shareable)
+        dataset_cache.set(url, dataset, granularity='raw')
+        df = _to_frame(dataset)
         
         logger.info(f"Data loaded: {len(df)} rows, {len(df.columns)} columns")
         return df
@@ -47,11 +119,73 @@ def load_data_from_url(url: str) -> pd.DataFrame:
         logger.error(f"Error loading data: {str(e)}")
         raise
 
+def _swapped_format(date_format: str) -> Optional[str]:
+    """Return the day/month-swapped counterpart of a known format, if it is also a candidate"""
+    swapped = date_format.replace('%m', '%_').replace('%d', '%m').replace('%_', '%d')
+    return swapped if swapped != date_format and swapped in _DATE_FORMATS else None
+
+def _count_parsed(strings: pa.Array, date_format: str) -> int:
+    """Count the values one vectorized Arrow strptime pass can parse with a format"""
+    return len(strings) - pc.strptime(strings, format=date_format, unit='s', error_is_null=True).null_count
+
+def _detect_date_format(dates: pd.Series, sample_size: int = 20) -> Optional[str]:
+    """
+    Find the known format that parses the most values in a small sample of dates
+    
+    A sample whose days are all <= 12 (e.g. monthly data on the 1st) fits both the day-first
+    and month-first variant of a layout; that tie is broken on the whole column, keeping
+    month-first unless the column shows otherwise.
+    
+    Returns:
+        Format string for pd.to_datetime, or None if no candidate parses any sampled value
+    """
+    sample = dates.dropna().head(sample_size).astype(str)
+    
+    best_format, best_parsed = None, 0
+    for date_format in _DATE_FORMATS:
+        parsed = pd.to_datetime(sample, format=date_format, errors='coerce').notna().sum()
+        if parsed > best_parsed:
+            best_format, best_parsed = date_format, parsed
+            if parsed == len(sample) and _swapped_format(date_format) is None:
+                break
+    
+    swapped = _swapped_format(best_format) if best_format is not None else None
+    if swapped is not None and pd.to_datetime(sample, format=swapped, errors='coerce').notna().sum() == best_parsed:
+        strings = pc.utf8_trim_whitespace(pa.array(dates.dropna().astype(str), type=pa.string()))
+        if _count_parsed(strings, swapped) > _count_parsed(strings, best_format):
+            best_format = swapped
+    return best_format
+
+def _parse_dates(dates: pd.Series, date_format: str) -> pd.Series:
+    """
+    Parse a date column with a known format (invalid values become NaT)
+    
+    ISO formats already take pandas' C fast path; other formats go through Arrow's
+    vectorized strptime instead of pandas' much slower per-element strptime.
+    """
+    if date_format in ('%Y-%m-%d', 'ISO8601'):
+        return pd.to_datetime(dates, format=date_format, errors='coerce')
+    
+    strings = pc.utf8_trim_whitespace(pa.array(dates.astype(str), type=pa.string()))
+    parsed = pc.strptime(strings, format=date_format, unit='ns', error_is_null=True)
+    parsed = pd.Series(parsed.to_numpy(zero_copy_only=False, writable=True), index=dates.index, name=dates.name)
+    
+    # Arrow rolls impossible days over (2/30 -> 3/2) where pandas rejects them; rolled dates
+    # always land on days 1-3, so re-parse only those rows strictly
+    suspect = (parsed.dt.day <= 3).to_numpy()
+    if suspect.any():
+        parsed[suspect] = pd.to_datetime(
+            pd.Series(strings.filter(suspect).to_numpy(zero_copy_only=False), index=dates.index[suspect]),
+            format=date_format, errors='coerce'
+        )
+    return parsed
+
 def preprocess_data(
     df: pd.DataFrame,
     date_col: str = 'date',
     value_col: str = 'sales',
-    granularity: str = 'daily'
+    granularity: str = 'daily',
+    cache_key: Optional[str] = None
 ) -> Tuple[pd.Series, pd.Series]:
     """
     Preprocess data for forecasting
@@ -61,14 +195,23 @@ def preprocess_data(
         date_col: Name of date column
         value_col: Name of value column (sales)
         granularity: Time granularity (daily, weekly, monthly)
+        cache_key: Dataset URL; when given, the train/test split is cached under it
         
     Returns:
         Tuple of (train_series, test_series) for validation
     """
     try:
+        # The split is deterministic per dataset and parameters, so reuse it while cached
+        cache_granularity = f"preprocessed:{granularity}:{date_col}:{value_col}"
+        if cache_key is not None:
+            cached_split = dataset_cache.get(cache_key, granularity=cache_granularity)
+            if cached_split is not None:
+                logger.info(f"Using cached preprocessed data: {len(cached_split[0])} train, {len(cached_split[1])} test samples")
+                return cached_split
+        
         # Detect date column if not specified
         if date_col not in df.columns:
-            date_cols = [col for col in df.columns if 'date' in col.lower() or 'time' in col.lower() or 'day' in col.lower() or 'month' in col.lower() or 'year' in col.lower()]
+            date_cols = [col for col in df.columns if _DATE_COL_RE.search(col)]
             if date_cols:
                 date_col = date_cols[0]
                 logger.info(f"Auto-detected date column: {date_col}")
@@ -78,17 +221,21 @@ def preprocess_data(
         # Detect value column if not specified
         if value_col not in df.columns:
             # Prioritize columns that are likely to be sales but NOT names (like "Sales Person")
-            potential_cols = [col for col in df.columns if any(x in col.lower() for x in ['sales', 'revenue', 'amount', 'value', 'price', 'quantity'])]
+            potential_cols = [col for col in df.columns if _VALUE_COL_RE.search(col)]
             
-            # Find the best numeric candidate among matches
+            # Find the best numeric candidate among matches (dtypes scanned once, not per candidate)
+            dtypes = df.dtypes
+            numeric_cols = {col for col, dtype in dtypes.items() if pd.api.types.is_numeric_dtype(dtype)}
             numeric_match = None
             for col in potential_cols:
                 # If it's already numeric, perfect
-                if pd.api.types.is_numeric_dtype(df[col]):
+                if col in numeric_cols:
                     numeric_match = col
                     break
-                # If it's a string, see if it looks like currency
-                if df[col].dtype == object and df[col].astype(str).str.contains('[\$0-9]', regex=True).any():
+                # If it's a string, see if it looks like currency (a 1000-row sample is enough)
+                if dtypes[col] == object and pc.any(pc.match_substring_regex(
+                    pa.array(df[col].head(1000).astype(str), type=pa.string()), r'[$0-9]'
+                )).as_py():
                     numeric_match = col
                     break
             
@@ -99,15 +246,21 @@ def preprocess_data(
         if value_col in df.columns and df[value_col].dtype == object:
             # Handle possible string formatting in currency columns
             logger.info(f"Cleaning currency formatting in column: {value_col}")
-            df[value_col] = df[value_col].astype(str).str.replace('$', '', regex=False).str.replace(',', '', regex=False).str.strip()
-            df[value_col] = pd.to_numeric(df[value_col], errors='coerce').fillna(0)
+            # One vectorized Arrow pass over the UTF-8 buffer instead of chained object-dtype .str calls
+            values = pa.array(df[value_col].astype(str), type=pa.string())
+            values = pc.utf8_trim_whitespace(pc.replace_substring_regex(values, r'[$,]', ''))
+            # Coerce anything that isn't a plain number to null, like pd.to_numeric(errors='coerce')
+            values = pc.if_else(pc.match_substring_regex(values, _NUMBER_PATTERN), values, None)
+            df[value_col] = pc.fill_null(pc.cast(values, pa.float64()), 0.0).to_numpy()
         
         # Convert date column to datetime with robust parsing
-        # Try a few common formats first to avoid day/month ambiguity
-        try:
-            # Try to infer format from first few rows
-            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-        except:
+        # Try a few common formats first to avoid day/month ambiguity; an explicit format
+        # parses the whole column in one vectorized strptime pass
+        date_format = _detect_date_format(df[date_col]) if df[date_col].dtype == object else None
+        if date_format is not None:
+            df[date_col] = _parse_dates(df[date_col], date_format)
+        else:
+            # No known format fits (or already datetime/numeric): parse each value on its own
             df[date_col] = pd.to_datetime(df[date_col], format='mixed', errors='coerce')
 
         # Drop rows with invalid dates
@@ -116,30 +269,20 @@ def preprocess_data(
             logger.warning(f"Dropped {len(df) - len(cleaned_df)} rows with invalid dates")
         df = cleaned_df
         
-        # 1. AGGREGATE: Group by date and sum values to handle multiple entries per date
-        logger.info(f"Aggregating data by {date_col}...")
-        df = df.groupby(date_col)[value_col].sum().reset_index()
-        
-        # 2. SORT: Ensure chronological order
-        df = df.sort_values(date_col)
+        # 1. SORT: Ensure chronological order (stable mergesort is near-linear on mostly ordered data)
+        series = df.set_index(date_col)[value_col].sort_index(kind='mergesort')
         
-        # 3. RESAMPLE: Ensure strict frequency and handle gaps
-        df = df.set_index(date_col)
-        
-        if granularity == 'daily':
-            df = df.resample('D').sum()
-        elif granularity == 'weekly':
-            df = df.resample('W').sum()
-        elif granularity == 'monthly':
-            df = df.resample('MS').sum() # Month Start to be consistent
-        
-        # Create final time series
-        series = df[value_col]
+        # 2. AGGREGATE + RESAMPLE: one pass sums multiple entries per date and enforces a strict
+        # frequency (filling gaps); resample already sums duplicate timestamps within each bin
+        logger.info(f"Aggregating data by {date_col}...")
+        freq = GRANULARITY_FREQ.get(granularity)
+        if freq is not None:
+            series = series.resample(freq).sum()
+        else:
+            series = series.groupby(level=0).sum()
         
-        # Handle gaps (missing values)
-        # We fill genuine NaNs (missing dates) with 0 or interpolation if needed.
-        # But we stop replacing actual 0 sales with previous values, as it smudges variance.
-        series = series.fillna(0)
+        # No gap filling needed: sum() skips NaN values and yields 0 for empty bins (missing dates),
+        # and actual 0 sales are kept as-is rather than replaced, which would smudge variance
         
         # Split into train/test (80/20)
         split_idx = int(len(series) * 0.8)
@@ -148,6 +291,9 @@ def preprocess_data(
         
         logger.info(f"Data preprocessed: {len(train_series)} train, {len(test_series)} test samples")
         
+        if cache_key is not None:
+            dataset_cache.set(cache_key, (train_series, test_series), granularity=cache_granularity)
+        
         return train_series, test_series
         
     except Exception as e:
@@ -161,7 +307,7 @@ def validate_data(df: pd.DataFrame) -> bool:
     if df.empty:
         raise ValueError("Dataset is empty")
     
-    if len(df) < 10:
-        raise ValueError("Dataset too small (minimum 10 rows required)")
+    if len(df) < MIN_DATASET_ROWS:
+        raise ValueError(f"Dataset too small (minimum {MIN_DATASET_ROWS} rows required)")
     
     return True
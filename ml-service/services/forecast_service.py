@@ -1,19 +1,89 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Literal
+from typing import Dict, List, Literal, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import logging
 
 from models.baseline import BaselineForecaster
 from models.arima import ARIMAForecaster
 from models.xgboost_model import XGBoostForecaster
-from services.data_loader import load_data_from_url, preprocess_data, validate_data
+from services.data_loader import GRANULARITY_FREQ, load_data_from_url, preprocess_data, validate_data
 from services.metrics import calculate_metrics
+from services.cache import result_cache, series_fingerprint
 
 logger = logging.getLogger(__name__)
 
 ModelType = Literal['baseline', 'arima', 'xgboost', 'auto']
 Granularity = Literal['daily', 'weekly', 'monthly']
 
+@lru_cache(maxsize=128)
+def _future_dates(last_ns: int, horizon: int, freq: str) -> Tuple[str, ...]:
+    """
+    Dates of the horizon periods following last_ns, formatted for the response
+    
+    Memoized: dashboards polling the same dataset request the same window repeatedly.
+    
+    Args:
+        last_ns: Last observed date (naive, nanoseconds since the epoch)
+        horizon: Number of periods to forecast
+        freq: Pandas frequency of the series (see GRANULARITY_FREQ)
+        
+    Returns:
+        Tuple of 'YYYY-MM-DD' strings
+    """
+    future_dates = pd.date_range(pd.Timestamp(last_ns), periods=horizon + 1, freq=freq)[1:]
+    return tuple(future_dates.strftime('%Y-%m-%d'))
+
+def _score_model(
+    model_type: str,
+    train_series: pd.Series,
+    actual_vals: np.ndarray,
+    val_horizon: int,
+    granularity: str,
+    xgb_features: Optional[Tuple] = None
+) -> Dict:
+    """
+    Fit one candidate model on the training data and score it on the validation slice
+    
+    Args:
+        model_type: baseline, arima, or xgboost
+        train_series: Training data
+        actual_vals: Actual values of the validation slice (at most val_horizon)
+        val_horizon: Number of validation periods to forecast
+        granularity: Time granularity
+        xgb_features: Precomputed XGBoost training features for train_series (optional)
+        
+    Returns:
+        Dictionary with accuracy, MAE, RMSE and R²
+    """
+    logger.info(f"Testing {model_type} model...")
+    
+    if model_type == 'baseline':
+        forecaster = BaselineForecaster(method='seasonal_naive')
+        predictions = forecaster.fit_predict(train_series, val_horizon)
+        
+    elif model_type == 'arima':
+        forecaster = ARIMAForecaster()
+        predictions = forecaster.fit_predict(train_series, val_horizon, auto_order=True)
+        
+    elif model_type == 'xgboost':
+        forecaster = XGBoostForecaster(n_lags=7)
+        predictions = forecaster.fit_predict(
+            train_series, val_horizon, granularity=granularity, precomputed_features=xgb_features
+        )
+    
+    # Calculate metrics on test set
+    metrics = calculate_metrics(actual_vals, predictions[:len(actual_vals)])
+    logger.info(f"{model_type}: accuracy={metrics['accuracy']}%, R²={metrics['r2']}")
+    
+    return {
+        'accuracy': metrics['accuracy'],
+        'mae': metrics['mae'],
+        'rmse': metrics['rmse'],
+        'r2': metrics['r2']
+    }
+
 class ForecastService:
     """
     Main forecasting service that orchestrates model selection and execution
@@ -23,7 +93,8 @@ class ForecastService:
         self,
         train_series: pd.Series,
         test_series: pd.Series,
-        granularity: Granularity = 'daily'
+        granularity: Granularity = 'daily',
+        xgb_features: Optional[Tuple] = None
     ) -> tuple[ModelType, Dict]:
         """
         Automatically select the best model based on validation performance
@@ -32,6 +103,8 @@ class ForecastService:
             train_series: Training data
             test_series: Test/validation data
             granularity: Time granularity
+            xgb_features: XGBoostForecaster.prepare_features output for train_series, shared with
+                the caller's final fit (computed by the XGBoost candidate if not given)
             
         Returns:
             Tuple of (best_model_type, model_scores)
@@ -41,39 +114,25 @@ class ForecastService:
         # Use smaller horizon for validation (last 20% of test set or max 30 periods)
         val_horizon = min(len(test_series), 30)
         
-        model_scores = {}
+        # Validation actuals as one array, in the dtype calculate_metrics works in (no cast per candidate)
+        actual_vals = test_series.to_numpy(dtype=np.float64)[:val_horizon]
         
-        # Test each model
-        for model_type in ['baseline', 'arima', 'xgboost']:
+        # Fit the candidates concurrently: the fits are independent and xgboost training releases
+        # the GIL, so it overlaps the (dominant) ARIMA fit. Threads rather than processes keep the
+        # seasonality/numba caches shared and avoid pickling the series.
+        candidates = ['baseline', 'arima', 'xgboost']
+        with ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="model-select") as executor:
+            futures = {
+                model_type: executor.submit(
+                    _score_model, model_type, train_series, actual_vals, val_horizon, granularity, xgb_features
+                )
+                for model_type in candidates
+            }
+        
+        model_scores = {}
+        for model_type, future in futures.items():
             try:
-                logger.info(f"Testing {model_type} model...")
-                
-                if model_type == 'baseline':
-                    forecaster = BaselineForecaster(method='seasonal_naive')
-                    predictions = forecaster.fit_predict(train_series, val_horizon)
-                    
-                elif model_type == 'arima':
-                    forecaster = ARIMAForecaster()
-                    predictions = forecaster.fit_predict(train_series, val_horizon, auto_order=True)
-                    
-                elif model_type == 'xgboost':
-                    forecaster = XGBoostForecaster(n_lags=7)
-                    predictions = forecaster.fit_predict(train_series, val_horizon, granularity=granularity)
-                
-                # Calculate metrics on test set
-                actual_vals = test_series.values[:val_horizon]
-                pred_vals = predictions[:len(actual_vals)]
-                
-                metrics = calculate_metrics(actual_vals, pred_vals)
-                model_scores[model_type] = {
-                    'accuracy': metrics['accuracy'],
-                    'mae': metrics['mae'],
-                    'rmse': metrics['rmse'],
-                    'r2': metrics['r2']
-                }
-                
-                logger.info(f"{model_type}: accuracy={metrics['accuracy']}%, R²={metrics['r2']}")
-                
+                model_scores[model_type] = future.result()
             except Exception as e:
                 logger.warning(f"{model_type} failed during auto-selection: {e}")
                 model_scores[model_type] = {'accuracy': 0, 'mae': float('inf'), 'rmse': float('inf'), 'r2': -1}
@@ -111,11 +170,22 @@ class ForecastService:
             df = load_data_from_url(dataset_url)
             validate_data(df)
             
-            train_series, test_series = preprocess_data(df, granularity=granularity)
+            train_series, test_series = preprocess_data(df, granularity=granularity, cache_key=dataset_url)
+            
+            # Identical data and settings always produce the same forecast
+            dataset_hash = series_fingerprint(train_series, test_series)
+            cached_result = result_cache.get(dataset_hash, model_type, horizon, granularity)
+            if cached_result is not None:
+                return cached_result
+            requested_model = model_type
             
             # Auto-select model if requested
+            xgb_features = None
             if model_type == 'auto':
-                model_type, model_scores = self.auto_select_model(train_series, test_series, granularity)
+                # XGBoost is fitted on the same training series during selection and again if it
+                # wins, so build its feature matrix once for both
+                xgb_features = XGBoostForecaster(n_lags=7).prepare_features(train_series, granularity=granularity)
+                model_type, model_scores = self.auto_select_model(train_series, test_series, granularity, xgb_features)
                 logger.info(f"Auto-selected {model_type} model")
             
             # Select and run model
@@ -129,7 +199,9 @@ class ForecastService:
                 
             elif model_type == 'xgboost':
                 forecaster = XGBoostForecaster(n_lags=7)
-                predictions = forecaster.fit_predict(train_series, horizon, granularity=granularity)
+                predictions = forecaster.fit_predict(
+                    train_series, horizon, granularity=granularity, precomputed_features=xgb_features
+                )
                 
             else:
                 raise ValueError(f"Unknown model type: {model_type}")
@@ -137,48 +209,46 @@ class ForecastService:
             # Calculate metrics using test set
             if len(test_series) > 0:
                 # Use test set for validation
-                test_predictions = predictions[:len(test_series)]
-                metrics = calculate_metrics(test_series.values, test_predictions)
+                test_arr = test_series.to_numpy(dtype=np.float64)
+                metrics = calculate_metrics(test_arr, predictions[:len(test_arr)])
             else:
                 # If no test set, use last N values of train set
                 n = min(horizon, len(train_series) // 5)
                 if n > 0:
-                    val_actual = train_series.iloc[-n:].values
-                    val_pred = predictions[:n]
-                    metrics = calculate_metrics(val_actual, val_pred)
+                    train_arr = train_series.to_numpy(dtype=np.float64)
+                    metrics = calculate_metrics(train_arr[-n:], predictions[:n])
                 else:
                     # Default metrics if validation not possible
                     metrics = {'mae': 0, 'rmse': 0, 'mape': 0, 'accuracy': 0}
             
-            # Generate future dates
+            # Generate future dates, on the same frequency the series was resampled to
             last_date = train_series.index[-1]
-            if granularity == 'daily':
-                future_dates = pd.date_range(last_date, periods=horizon + 1, freq='D')[1:]
-            elif granularity == 'weekly':
-                future_dates = pd.date_range(last_date, periods=horizon + 1, freq='W')[1:]
-            elif granularity == 'monthly':
-                future_dates = pd.date_range(last_date, periods=horizon + 1, freq='M')[1:]
-            
-            # Format predictions with confidence bounds
-            prediction_list = []
-            for i, (date, value) in enumerate(zip(future_dates, predictions)):
-                # Simulate confidence intervals (placeholder until models updated)
-                # Ideally bounds come from the model, but we add 10% spread as fallback
-                margin = float(value) * 0.1 * (1 + (i / horizon)) 
-                prediction_list.append({
-                    'date': date.strftime('%Y-%m-%d'),
-                    'value': float(value),
-                    'lower': max(0, float(value) - margin),
-                    'upper': float(value) + margin
-                })
+            if last_date.tz is not None:
+                last_date = last_date.tz_localize(None)
+            future_dates = _future_dates(last_date.value, horizon, GRANULARITY_FREQ[granularity])
+            
+            # Format predictions with confidence bounds (dates, values and bounds computed as arrays,
+            # converted to Python objects once)
+            n_points = min(len(future_dates), len(predictions))
+            date_strs = future_dates[:n_points]
+            values = np.asarray(predictions[:n_points], dtype=np.float64)
+            # Simulate confidence intervals (placeholder until models updated)
+            # Ideally bounds come from the model, but we add 10% spread as fallback
+            margins = values * 0.1 * (1 + (np.arange(n_points) / horizon))
+            lowers = np.maximum(0, values - margins)
+            uppers = values + margins
+            prediction_list = [
+                {'date': date, 'value': value, 'lower': lower, 'upper': upper}
+                for date, value, lower, upper in zip(date_strs, values.tolist(), lowers.tolist(), uppers.tolist())
+            ]
             
             # Generate Executive Insights
-            total_val = float(np.sum(predictions))
+            total_val = float(np.sum(predictions, dtype=np.float64))
             growth = 0.0
             if len(train_series) > 0:
                 recent_avg = train_series.tail(len(predictions)).mean() if len(train_series) >= len(predictions) else train_series.mean()
                 if recent_avg > 0:
-                    growth = round(((np.mean(predictions) / recent_avg) - 1) * 100, 1)
+                    growth = round(((np.mean(predictions, dtype=np.float64) / recent_avg) - 1) * 100, 1)
 
             trend = "Growth" if growth > 2 else "Decline" if growth < -2 else "Stable"
             conf = "High" if metrics['accuracy'] > 75 else "Medium" if metrics['accuracy'] > 50 else "Low"
@@ -196,6 +266,8 @@ class ForecastService:
                 'metrics': {**metrics, 'insights': insights}
             }
             
+            result_cache.set(dataset_hash, requested_model, horizon, granularity, result)
+            
             logger.info(f"Forecast completed: {len(prediction_list)} points, {trend} trend detected ({growth}%).")
             
             return result
@@ -1,9 +1,70 @@
 import numpy as np
 from typing import Dict
+from collections import OrderedDict
+from numba import njit
+from utils.jit import FASTMATH
+import hashlib
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Memo of recent results (auto-selection and the final forecast often score identical arrays).
+# Keyed by a hash of the full contents; longer inputs are cheaper to recompute than to hash.
+METRICS_MEMO_MAXSIZE = 256
+METRICS_MEMO_MAX_POINTS = 4096
+_memo: OrderedDict = OrderedDict()
+_memo_lock = threading.Lock()
+
+@njit(cache=True, fastmath=FASTMATH)
+def _metrics_kernel(actual, predicted):
+    """
+    Single pass over actual/predicted accumulating every sum calculate_metrics needs
+    
+    Returns:
+        (abs_sum, sq_sum, ape_sum, ape_count, sape_sum, sape_count, mean_actual, ss_tot, naive_sq_sum)
+    """
+    abs_sum = 0.0
+    sq_sum = 0.0
+    ape_sum = 0.0
+    ape_count = 0
+    sape_sum = 0.0
+    sape_count = 0
+    mean_actual = 0.0
+    ss_tot = 0.0  # Welford: sum of squared deviations from the running mean
+    naive_sq_sum = 0.0
+    previous = actual[0] if len(actual) > 0 else 0.0
+    
+    for i in range(len(actual)):
+        a = actual[i]
+        p = predicted[i]
+        err = a - p
+        abs_err = abs(err)
+        abs_sum += abs_err
+        sq_sum += err * err
+        
+        # MAPE/sMAPE terms over non-zero denominators, as selects rather than branches so the
+        # loop has no data-dependent jumps
+        nonzero = a != 0
+        ape_sum += abs_err / abs(a) if nonzero else 0.0
+        ape_count += nonzero
+        
+        denominator = (abs(a) + abs(p)) / 2
+        nonzero = denominator != 0
+        sape_sum += abs_err / denominator if nonzero else 0.0
+        sape_count += nonzero
+        
+        delta = a - mean_actual
+        mean_actual += delta / (i + 1)
+        ss_tot += delta * (a - mean_actual)
+        
+        # Naive (shift-by-1) forecast error for RMSSE; the first step is a - a = 0
+        step = a - previous
+        naive_sq_sum += step * step
+        previous = a
+    
+    return abs_sum, sq_sum, ape_sum, ape_count, sape_sum, sape_count, mean_actual, ss_tot, naive_sq_sum
+
 def calculate_metrics(actual: np.ndarray, predicted: np.ndarray) -> Dict[str, float]:
     """
     Calculate comprehensive forecasting accuracy metrics
@@ -15,52 +76,56 @@ def calculate_metrics(actual: np.ndarray, predicted: np.ndarray) -> Dict[str, fl
     Returns:
         Dictionary with MAE, RMSE, MAPE, sMAPE, R², and accuracy
     """
-    # Ensure arrays are same length
+    # Ensure arrays are same length; float64 throughout, since float32 cannot resolve forecast
+    # errors at realistic revenue magnitudes (and loses whole units above 2**24)
     min_len = min(len(actual), len(predicted))
-    actual = actual[:min_len]
-    predicted = predicted[:min_len]
+    actual = np.ascontiguousarray(actual[:min_len], dtype=np.float64)
+    predicted = np.ascontiguousarray(predicted[:min_len], dtype=np.float64)
     
-    # Mean Absolute Error
-    mae = np.mean(np.abs(actual - predicted))
+    key = None
+    if min_len <= METRICS_MEMO_MAX_POINTS:
+        digest = hashlib.blake2b(actual.tobytes(), digest_size=16)
+        digest.update(predicted.tobytes())
+        key = (min_len, digest.digest())
+        with _memo_lock:
+            cached = _memo.get(key)
+            if cached is not None:
+                _memo.move_to_end(key)
+                return dict(cached)
     
-    # Root Mean Squared Error
-    rmse = np.sqrt(np.mean((actual - predicted) ** 2))
+    # All sums in one fused pass instead of a NumPy temporary per metric
+    (abs_sum, sq_sum, ape_sum, ape_count, sape_sum, sape_count,
+     mean_actual, ss_tot, naive_sq_sum) = _metrics_kernel(actual, predicted)
     
-    # Mean Absolute Percentage Error (traditional)
-    # Avoid division by zero
-    mask = actual != 0
-    if mask.sum() > 0:
-        mape = np.mean(np.abs((actual[mask] - predicted[mask]) / actual[mask])) * 100
+    # Mean Absolute Error and Root Mean Squared Error
+    if min_len > 0:
+        mae = abs_sum / min_len
+        mse = sq_sum / min_len
     else:
-        mape = 0.0
+        mae = mse = np.nan
+        mean_actual = np.nan
+    rmse = np.sqrt(mse)
+    
+    # Mean Absolute Percentage Error (traditional), over non-zero actuals
+    mape = ape_sum / ape_count * 100 if ape_count > 0 else 0.0
     
     # Symmetric MAPE (handles zeros better)
     # sMAPE = 100 * mean(|actual - predicted| / ((|actual| + |predicted|) / 2))
-    denominator = (np.abs(actual) + np.abs(predicted)) / 2
-    # Avoid division by zero
-    smape_mask = denominator != 0
-    if smape_mask.sum() > 0:
-        smape = np.mean(np.abs(actual[smape_mask] - predicted[smape_mask]) / denominator[smape_mask]) * 100
-    else:
-        smape = 0.0
+    smape = sape_sum / sape_count * 100 if sape_count > 0 else 0.0
     
     # R² Score (coefficient of determination)
     # R² = 1 - (SS_res / SS_tot)
-    ss_res = np.sum((actual - predicted) ** 2)
-    ss_tot = np.sum((actual - np.mean(actual)) ** 2)
     if ss_tot > 0:
-        r2 = 1 - (ss_res / ss_tot)
+        r2 = 1 - (sq_sum / ss_tot)
     else:
         r2 = 0.0
     
     # RMSSE (Root Mean Squared Scaled Error) - normalized by naive forecast
     # Useful for comparing across different datasets
-    if len(actual) > 1:
-        naive_forecast = actual[:-1]  # Shift by 1
-        naive_actual = actual[1:]
-        naive_mse = np.mean((naive_actual - naive_forecast) ** 2)
+    if min_len > 1:
+        naive_mse = naive_sq_sum / (min_len - 1)
         if naive_mse > 0:
-            rmsse = np.sqrt(np.mean((actual - predicted) ** 2) / naive_mse)
+            rmsse = np.sqrt(mse / naive_mse)
         else:
             rmsse = 0.0
     else:
@@ -68,7 +133,6 @@ def calculate_metrics(actual: np.ndarray, predicted: np.ndarray) -> Dict[str, fl
     
     # Accuracy (using WAPE - Weighted Absolute Percentage Error as it's the industry standard for sales)
     # This is more robust to zeros than sMAPE/MAPE
-    mean_actual = np.mean(actual)
     if mean_actual > 0:
         wape = mae / mean_actual
         accuracy = max(0, (1 - wape) * 100)
@@ -87,4 +151,10 @@ def calculate_metrics(actual: np.ndarray, predicted: np.ndarray) -> Dict[str, fl
     
     logger.info(f"Metrics: MAE={metrics['mae']}, RMSE={metrics['rmse']}, sMAPE={metrics['smape']}%, R²={metrics['r2']}, Accuracy={metrics['accuracy']}%")
     
+    if key is not None:
+        with _memo_lock:
+            _memo[key] = dict(metrics)
+            while len(_memo) > METRICS_MEMO_MAXSIZE:
+                _memo.popitem(last=False)
+    
     return metrics
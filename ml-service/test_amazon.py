@@ -5,7 +5,7 @@ import traceback
 try:
     print("Loading amazon.csv...")
     df = pd.read_csv('../../insight-readiness-analyzer/amazon.csv')
-    df.columns = df.columns.str.strip().str.replace('\ufeff', '')
+    df.columns = [c.lstrip('\ufeff').strip() for c in df.columns]
     
     print("Columns are:", df.columns.tolist())
     print("Row count:", len(df))
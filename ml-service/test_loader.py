@@ -10,7 +10,7 @@ try:
     from io import StringIO
     df = pd.read_csv(StringIO(text))
     # Emulate the fix
-    df.columns = df.columns.str.strip().str.replace('\ufeff', '')
+    df.columns = [c.lstrip('\ufeff').strip() for c in df.columns]
 
     print("Columns are:", df.columns.tolist())
     train, test = preprocess_data(df, granularity='daily')
@@ -0,0 +1,7 @@
+"""
+Shared numba settings for the compiled kernels
+"""
+
+# fastmath without the no-NaN/no-inf assumptions ('nnan', 'ninf'): metric inputs and lag/roc
+# features are legitimately NaN/inf and must still propagate through the kernels
+FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}